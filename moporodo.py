@@ -4,10 +4,17 @@ import time
 import subprocess
 import threading
 import configparser
+import io
 import os
+import queue
+import select
+import shlex
+import shutil
+import stat
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- Dependency Handling ---
 # Set DISPLAY environment variable for X11 if not set
@@ -32,6 +39,39 @@ except ImportError:
     print("WARNING: 'pygame' library not found. Falling back to system bell for alerts.")
     print("Install it with 'pip install pygame' for custom sound support.")
 
+try:
+    from Xlib import X, Xatom, display as xdisplay
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+    print("WARNING: 'python-xlib' library not found. Falling back to polling for focus changes.")
+
+try:
+    import xcffib
+    import xcffib.xproto
+    XCFFIB_AVAILABLE = True
+except ImportError:
+    XCFFIB_AVAILABLE = False # Active window titles are read through pywinctl instead
+
+# wmctrl lists all windows in one X round trip, cheaper than pywinctl's per-window lookups
+WMCTRL_PATH = shutil.which("wmctrl")
+
+# --- Helpers ---
+
+# Zero-padded countdown fields, so the per-second label update is a table lookup
+_SS = [f"{i:02d}" for i in range(60)]
+_MM = [f"{i:02d}" for i in range(120)]
+
+def split_command(command):
+    """Split a configured command line into an argv list, keeping quoted paths with spaces intact."""
+    try:
+        if os.name == "nt":
+            # POSIX mode would eat the backslashes in Windows paths
+            return [part.strip('"') for part in shlex.split(command, posix=False)]
+        return shlex.split(command)
+    except ValueError:
+        return command.split() # Unbalanced quotes, fall back to plain whitespace splitting
+
 # --- Main Application Class ---
 
 class PomodoroApp:
@@ -45,15 +85,29 @@ class PomodoroApp:
         # --- State Variables ---
         self.game_process = None
         self.study_process = None
-        self.sound_playing = False
-        self.active_sound_threads = {} # Manages a thread for each alert stage sound
+        self._sounds_active = False # True while alert sounds are scheduled on the audio thread
+        self._active_mask = 0 # Bit n is set while alert stage n is scheduled on the audio thread
         self.loaded_sounds = {} # Cache for loaded pygame sounds
         self.timer_running = False
         self.stop_monitoring = threading.Event()
         self.current_phase = "Ready"
         self.time_remaining = 0
         self.alert_stage = 0
+        self._last_alert_stage = -1 # Stage for which alert sounds were last started
+        self._target_title_lower = "" # Case-folded title of the window that should have focus
+        self._active_window_cache = (0.0, (None, None)) # (monotonic timestamp, (window id, title)) of last lookup
+        self._target_wid = None # Window id of the target application, when it could be determined
+        self.phase_end_time = None
         self.monitor_thread = None
+        self._ui_visible = True # False while the main window is minimized or fully obscured
+        self._timer_after_id = None # Pending after() id of the next timer display tick
+
+        # --- X11 Focus Events ---
+        self.x_display = None
+        self.watched_window_id = None
+        self._open_x_connection()
+        self.xcb_conn = None
+        self._open_xcb_connection()
         
         # --- Default Durations ---
         self.durs = {
@@ -65,6 +119,13 @@ class PomodoroApp:
         self.alert_sounds = {}
         self.config = self.load_config()
 
+        # --- Audio Scheduler ---
+        self._sound_queue = queue.PriorityQueue() # (next_play_time, stage, generation)
+        self._sound_wakeup = threading.Event() # Set when the queue changes under the audio thread
+        self._sound_generation = 0 # Bumped on stop so stale queue entries are discarded
+        self.audio_thread = threading.Thread(target=self._audio_loop, name="AudioThread", daemon=True)
+        self.audio_thread.start()
+
         self.setup_gui()
 
     # --- Core Logic ---
@@ -75,27 +136,25 @@ class PomodoroApp:
         self.timer_running = True
         
         try:
+            # The config cannot change while a session is running
+            game_title = self.config.get("Settings", "game_title")
+            study_app_title = self.config.get("Settings", "study_app_title")
+
             for i in range(4):
                 if self.stop_monitoring.is_set(): break
                 # Game Phase
                 self.current_phase = f"Game Time ({i+1}/4)"
-                self.start_and_monitor(self.config.get("Settings", "game_path"), 
-                                       self.config.get("Settings", "game_title"), 
-                                       self.durs["game"])
+                self.start_and_monitor(self._game_argv, game_title, self.durs["game"])
 
                 if self.stop_monitoring.is_set(): break
                 # Short Study Phase
                 self.current_phase = f"Study Time ({i+1}/4)"
-                self.start_and_monitor(self.config.get("Settings", "study_app_path"), 
-                                       self.config.get("Settings", "study_app_title"), 
-                                       self.durs["short_study"])
+                self.start_and_monitor(self._study_argv, study_app_title, self.durs["short_study"])
 
             if not self.stop_monitoring.is_set():
                 # Long Study Phase
                 self.current_phase = "Long Study Session"
-                self.start_and_monitor(self.config.get("Settings", "study_app_path"),
-                                       self.config.get("Settings", "study_app_title"),
-                                       self.durs["long_study"])
+                self.start_and_monitor(self._study_argv, study_app_title, self.durs["long_study"])
 
             if not self.stop_monitoring.is_set():
                 self.current_phase = "All Cycles Complete"
@@ -107,50 +166,242 @@ class PomodoroApp:
         
         self.reset_ui()
 
-    def start_and_monitor(self, app_path, app_title, duration):
+    def start_and_monitor(self, app_argv, app_title, duration):
         """Helper to start an application and monitor focus on it."""
         if self.stop_monitoring.is_set(): return
         
         print(f"Starting phase: {self.current_phase}")
-        self._start_application(app_path, app_title)
-        time.sleep(3) # Give app time to launch/activate
+        # Show the new phase's full duration while the app launches, not the last phase's 00:00
+        self.phase_end_time = None
+        self.time_remaining = duration
+
+        # Launching and waiting for focus share one 10 second budget
+        launch_deadline = time.monotonic() + 10
+        if self._start_application(app_argv, app_title, launch_deadline):
+            self._wait_for_window(app_title, launch_deadline)
         self._monitor_focus(app_title, duration)
 
+    def _wait_for_window(self, app_title, deadline):
+        """Wait until the app's window is active, the deadline passes, or monitoring stops."""
+        self._target_title_lower = app_title.lower()
+
+        if self.x_display is not None:
+            self._watch_active_window()
+
+        while not self.stop_monitoring.is_set():
+            active_window_id, active_window_title = self._get_active_window()
+            if active_window_id and active_window_id == self._target_wid:
+                return True
+            if active_window_title and not self._is_focus_lost(active_window_id, active_window_title):
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"Timed out waiting for window: {app_title}")
+                return False
+            self._wait_for_focus_change(remaining)
+        return False
+
     def _monitor_focus(self, target_title, duration_seconds):
         """Monitor focus on the target application and enforce it."""
-        start_time = time.time()
+        self.phase_end_time = time.monotonic() + duration_seconds
         self.time_remaining = duration_seconds
         last_focus_lost_time = None
         self.alert_stage = 0
+        self._last_alert_stage = -1
+        self._target_title_lower = target_title.lower() # Fold once per phase, not per comparison
+
+        if self.x_display is not None:
+            self._watch_active_window()
+        active_window_id, active_window_title = self._get_active_window()
+        focus_lost = self._is_focus_lost(active_window_id, active_window_title)
+
+        while not self.stop_monitoring.is_set():
+            now = time.monotonic()
+            wait_time = self.phase_end_time - now
+            if wait_time <= 0:
+                break
 
-        while (time.time() - start_time) < duration_seconds and not self.stop_monitoring.is_set():
-            active_window_title = self._get_active_window_title()
-
-            if active_window_title and target_title.lower() not in active_window_title.lower():
+            if focus_lost:
                 if last_focus_lost_time is None:
-                    last_focus_lost_time = time.time()
+                    last_focus_lost_time = now
 
                 # Escalate alert stage every 10 seconds of lost focus
-                if time.time() - last_focus_lost_time >= 10 and self.alert_stage < 5:
-                    self.alert_stage += 1
-                    last_focus_lost_time = time.time() # Reset timer for the next stage
+                stage = min(int((now - last_focus_lost_time) // 10), 5)
+                if stage != self.alert_stage:
+                    self.alert_stage = stage
                     print(f"Alert stage increased to: {self.alert_stage}")
 
-                self._manage_alert_sounds()
-                
+                # Only touch the sound threads when the stage actually changes
+                if self.alert_stage != self._last_alert_stage:
+                    self._manage_alert_sounds()
+                    self._last_alert_stage = self.alert_stage
+
                 print(f"Focus lost! Active: '{active_window_title}' (Stage {self.alert_stage})")
+
+                # Wake up again in time for the next escalation
+                if self.alert_stage < 5:
+                    next_stage_time = last_focus_lost_time + (self.alert_stage + 1) * 10
+                    wait_time = min(wait_time, next_stage_time - now)
             else:
-                if self.sound_playing:
+                if self._sounds_active:
                     self._stop_all_sounds()
                 self.alert_stage = 0
+                self._last_alert_stage = -1
                 last_focus_lost_time = None
-            
-            self.time_remaining = int(duration_seconds - (time.time() - start_time))
-            time.sleep(1)
+
+            if self._wait_for_focus_change(wait_time):
+                active_window_id, active_window_title = self._get_active_window()
+                focus_lost = self._is_focus_lost(active_window_id, active_window_title)
 
         self._stop_all_sounds()
         print(f"Focus monitoring ended for: {target_title}")
 
+    def _is_focus_lost(self, active_window_id, active_window_title):
+        """Check whether the active window is something other than the current target."""
+        if self._target_wid and active_window_id == self._target_wid:
+            return False # Fast path, the exact target window is active
+        # Other windows (a restarted instance, a dialog) still count if their title matches
+        return bool(active_window_title) and self._target_title_lower not in active_window_title.lower()
+
+    # --- X11 Focus Events ---
+
+    def _open_x_connection(self):
+        """Subscribe to _NET_ACTIVE_WINDOW changes on the X root window, if possible."""
+        if not XLIB_AVAILABLE:
+            return
+
+        try:
+            self.x_display = xdisplay.Display()
+            self.x_root = self.x_display.screen().root
+            self.x_root.change_attributes(event_mask=X.PropertyChangeMask)
+            self.net_active_window = self.x_display.intern_atom("_NET_ACTIVE_WINDOW")
+            self.net_wm_name = self.x_display.intern_atom("_NET_WM_NAME")
+            self.net_client_list = self.x_display.intern_atom("_NET_CLIENT_LIST")
+            self.x_display.flush()
+            # Self-pipe used to interrupt select() when the session is stopped
+            self._wake_r, self._wake_w = os.pipe()
+        except Exception as e:
+            print(f"Could not subscribe to X11 focus events, falling back to polling: {e}")
+            self.x_display = None
+
+    def _open_xcb_connection(self):
+        """Open a lightweight XCB connection for reading the active window title, if possible."""
+        if not XCFFIB_AVAILABLE:
+            return
+
+        try:
+            conn = xcffib.connect()
+            self.xcb_root = conn.get_setup().roots[conn.pref_screen].root
+            names = ("_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "UTF8_STRING")
+            cookies = [conn.core.InternAtom(False, len(name), name) for name in names]
+            self.xcb_atoms = dict(zip(names, (cookie.reply().atom for cookie in cookies)))
+            self.xcb_conn = conn
+        except Exception as e:
+            print(f"Could not open XCB connection, using pywinctl for window titles: {e}")
+
+    def _close_xcb_connection(self):
+        """Drop the XCB connection so window titles are read through pywinctl."""
+        try:
+            self.xcb_conn.disconnect()
+        except Exception as e:
+            print(f"Error closing XCB connection: {e}")
+        self.xcb_conn = None
+
+    def _get_active_window_xcb(self):
+        """Read the active window id and title with raw XCB property requests."""
+        core = self.xcb_conn.core
+        reply = core.GetProperty(False, self.xcb_root, self.xcb_atoms["_NET_ACTIVE_WINDOW"],
+                                 xcffib.xproto.Atom.WINDOW, 0, 1).reply()
+        window_ids = reply.value.to_atoms() if reply.value_len else ()
+        if not window_ids or not window_ids[0]:
+            return None, None
+
+        # Request both title properties up front so they share a single round trip
+        net_wm_name = core.GetProperty(False, window_ids[0], self.xcb_atoms["_NET_WM_NAME"],
+                                       self.xcb_atoms["UTF8_STRING"], 0, 1024)
+        # WM_NAME may be STRING, UTF8_STRING or COMPOUND_TEXT, so accept any type
+        wm_name = core.GetProperty(False, window_ids[0], xcffib.xproto.Atom.WM_NAME,
+                                   xcffib.xproto.GetPropertyType.Any, 0, 1024)
+        self.xcb_conn.flush()
+        net_wm_name, wm_name = net_wm_name.reply(), wm_name.reply()
+        if net_wm_name.value_len:
+            return window_ids[0], net_wm_name.value.buf().decode("utf-8", "replace")
+        if not wm_name.value_len:
+            return window_ids[0], ""
+        if wm_name.type == xcffib.xproto.Atom.STRING:
+            return window_ids[0], wm_name.value.buf().decode("latin-1")
+        # UTF8_STRING, and COMPOUND_TEXT, whose ASCII subset decodes the same way
+        return window_ids[0], wm_name.value.buf().decode("utf-8", "replace")
+
+    def _wake_monitor(self):
+        """Interrupt a monitor thread that is blocked waiting for X events."""
+        if self.x_display is not None:
+            os.write(self._wake_w, b"\0")
+
+    def _watch_active_window(self):
+        """Listen for title changes on the currently active window."""
+        try:
+            prop = self.x_root.get_full_property(self.net_active_window, X.AnyPropertyType)
+            window_id = prop.value[0] if prop and len(prop.value) else None
+        except Exception as e:
+            print(f"Error reading _NET_ACTIVE_WINDOW: {e}")
+            window_id = None
+
+        if window_id == self.watched_window_id:
+            return
+
+        # Windows may vanish at any time, so ignore errors from other clients' windows
+        ignore_error = lambda *args: None
+        if self.watched_window_id:
+            old_window = self.x_display.create_resource_object("window", self.watched_window_id)
+            old_window.change_attributes(event_mask=X.NoEventMask, onerror=ignore_error)
+        if window_id:
+            new_window = self.x_display.create_resource_object("window", window_id)
+            new_window.change_attributes(event_mask=X.PropertyChangeMask, onerror=ignore_error)
+        self.watched_window_id = window_id
+
+    def _drain_x_events(self):
+        """Consume queued X events, returning True if focus, the active title or the window list changed."""
+        changed = False
+        while self.x_display.pending_events():
+            event = self.x_display.next_event()
+            if event.type != X.PropertyNotify:
+                continue
+            if event.atom == self.net_active_window:
+                self._watch_active_window()
+                changed = True
+            elif event.atom in (self.net_wm_name, Xatom.WM_NAME) and event.window.id == self.watched_window_id:
+                changed = True
+            elif event.atom == self.net_client_list:
+                changed = True # A window was opened or closed
+        if changed:
+            self._active_window_cache = (0.0, (None, None)) # A real change invalidates the memoized window
+        return changed
+
+    def _wait_for_focus_change(self, timeout):
+        """Block until focus changes, the timeout elapses, or monitoring is stopped.
+
+        Returns True if the active window title should be read again.
+        """
+        if self.x_display is None:
+            # No event source available, poll once per second (less often while the UI is hidden)
+            poll_interval = 1 if self._ui_visible else 3
+            self.stop_monitoring.wait(min(timeout, poll_interval))
+            return True
+
+        try:
+            if self._drain_x_events():
+                return True
+            readable, _, _ = select.select([self.x_display.fileno(), self._wake_r], [], [], max(timeout, 0))
+            if self._wake_r in readable:
+                os.read(self._wake_r, 64)
+            return self._drain_x_events()
+        except Exception as e:
+            print(f"Lost X11 connection, falling back to polling: {e}")
+            self.x_display = None
+            return True
+
     # --- Sound Handling ---
 
     def _load_sound(self, sound_path):
@@ -176,74 +427,113 @@ class PomodoroApp:
             print(f"Error loading sound '{sound_path}': {e}")
             return None
 
-    def _sound_player_loop(self, sound_path):
-        """A loop to play a single sound file repeatedly. Meant to be run in a thread."""
-        sound = self._load_sound(sound_path)
-        
-        while self.sound_playing:
-            try:
-                if sound and PYGAME_AVAILABLE:
-                    # Play the sound and wait for it to finish
-                    sound.play()
-                    # Get the length of the sound to know how long to wait
-                    sound_length = sound.get_length()
-                    time.sleep(sound_length)
-                else:
-                    # Fall back to system bell
-                    self.root.bell()
-                    time.sleep(1)  # System bell needs a longer pause
-            except Exception as e:
-                print(f"Error playing sound '{sound_path}': {e}. Falling back to system bell.")
-                self.root.bell()
-                time.sleep(1)  # Prevent rapid error loops
-
-            if not self.sound_playing:
-                break
-            time.sleep(0.1)  # Small delay between repetitions
+    def _play_alert_sound(self, stage):
+        """Play a stage's preloaded sound once and return how long to wait before playing it again."""
+        sound = self._sound_buffers.get(f"stage_{stage}")
+        try:
+            if sound and PYGAME_AVAILABLE:
+                sound.play()
+                return sound.get_length() + 0.1  # Small delay between repetitions
+        except Exception as e:
+            print(f"Error playing sound for stage {stage}: {e}. Falling back to system bell.")
+
+        # Fall back to system bell, which needs a longer pause
+        self.root.bell()
+        return 1
+
+    def _audio_loop(self):
+        """Play the sounds of all active alert stages. Runs in the single audio thread."""
+        while True:
+            self._sound_wakeup.clear()
+            next_play_time, stage, generation = self._sound_queue.get()
+            if stage < 0:
+                break  # Shutdown sentinel
+            if generation != self._sound_generation:
+                continue  # Sounds were stopped after this entry was scheduled
+
+            delay = next_play_time - time.monotonic()
+            if delay > 0 and self._sound_wakeup.wait(delay):
+                # Queue changed or sounds were stopped, re-evaluate from the top
+                self._sound_queue.put((next_play_time, stage, generation))
+                continue
+            if generation != self._sound_generation:
+                continue
+
+            interval = self._play_alert_sound(stage)
+            self._sound_queue.put((time.monotonic() + interval, stage, generation))
 
     def _manage_alert_sounds(self):
-        """Manages sound threads, starting new ones for each alert stage."""
-        if not self.sound_playing:
-            self.sound_playing = True
+        """Schedules a repeating sound on the audio thread for each alert stage."""
+        self._sounds_active = True
 
         for stage in range(self.alert_stage + 1):
-            if stage not in self.active_sound_threads:
-                sound_path = self.alert_sounds.get(f"stage_{stage}", "system_bell")
-                thread = threading.Thread(target=self._sound_player_loop, args=(sound_path,), daemon=True)
-                thread.start()
-                self.active_sound_threads[stage] = thread
-                print(f"Started sound thread for alert stage {stage}.")
+            if not (self._active_mask >> stage) & 1:
+                self._active_mask |= 1 << stage
+                self._sound_queue.put((time.monotonic(), stage, self._sound_generation))
+                print(f"Scheduled sound for alert stage {stage}.")
+        self._sound_wakeup.set()
 
     def _stop_all_sounds(self):
-        """Stops all currently running sound alert threads."""
-        if not self.sound_playing:
+        """Stops all currently scheduled alert sounds."""
+        if not self._sounds_active:
             return
-        
-        self.sound_playing = False  # Signal all threads to stop their loops
-        
+
+        self._sounds_active = False
+        self._sound_generation += 1  # Invalidate the entry the audio thread may be holding
+        self._active_mask = 0
+        while True:
+            try:
+                self._sound_queue.get_nowait()
+            except queue.Empty:
+                break
+        self._sound_wakeup.set()
+
         # Stop all pygame sounds immediately
         if PYGAME_AVAILABLE:
             pygame.mixer.stop()
-        
-        print("Stopping all sound threads...")
-        for stage, thread in self.active_sound_threads.items():
-            if thread.is_alive():
-                thread.join(timeout=0.2)  # Wait briefly for the thread to exit
-        
-        self.active_sound_threads.clear() # Clear the dictionary of threads
-        print("All sound threads stopped.")
+
+        print("All alert sounds stopped.")
+
+    def _shutdown_audio(self):
+        """Stop the audio thread for good."""
+        self._stop_all_sounds()
+        self._sound_queue.put((float("-inf"), -1, None))
+        self._sound_wakeup.set()
+        self.audio_thread.join(timeout=1)
 
 
     # --- Application & Window Management ---
 
-    def _get_active_window_title(self):
-        """Get the title of the currently active window."""
+    def _get_active_window(self):
+        """Get the (window id, title) of the currently active window, reusing lookups from the last 500ms."""
+        cached_at, cached_window = self._active_window_cache
+        now = time.monotonic()
+        if now - cached_at < 0.5:
+            return cached_window
+
+        if self.xcb_conn is not None:
+            try:
+                active = self._get_active_window_xcb()
+            except xcffib.ConnectionException as e:
+                print(f"Lost XCB connection, falling back to pywinctl: {e}")
+                self._close_xcb_connection()
+            except Exception as e:
+                # Protocol errors such as BadWindow when the active window closes mid-lookup
+                print(f"Error reading active window over XCB: {e}")
+                active = (None, None)
+            if self.xcb_conn is not None:
+                self._active_window_cache = (now, active)
+                return active
+
         try:
             active_window = pwc.getActiveWindow()
-            return active_window.title if active_window else None
+            active = (active_window.getHandle(), active_window.title) if active_window else (None, None)
         except Exception as e:
             print(f"Error getting active window: {e}")
-            return None
+            active = (None, None)
+
+        self._active_window_cache = (now, active)
+        return active
 
     def _find_existing_window(self, app_title):
         """Find an existing window that matches the app title using multiple strategies."""
@@ -276,58 +566,138 @@ class PomodoroApp:
         
         return None
 
-    def _start_application(self, app_path, app_title):
-        """Start an application or activate an existing instance."""
-        if not app_path:
+    def _find_window_wmctrl(self, app_title):
+        """Find a window matching the app title from a single `wmctrl -l` snapshot.
+
+        Returns a (window_id, title) tuple or None. Raises if wmctrl itself fails.
+        """
+        output = subprocess.check_output([WMCTRL_PATH, "-l"], text=True, timeout=2)
+        windows = []
+        for line in output.splitlines():
+            # Columns: window id, desktop, host, title (which may contain spaces)
+            parts = line.split(None, 3)
+            if len(parts) == 4:
+                windows.append((parts[0], parts[3]))
+
+        # Same strategies as _find_existing_window: exact, partial, then keyword match
+        for window_id, title in windows:
+            if title == app_title:
+                return window_id, title
+        app_title_lower = app_title.lower()
+        for window_id, title in windows:
+            if app_title_lower in title.lower():
+                return window_id, title
+        keywords = [word.lower() for word in app_title.split() if len(word) > 2]
+        for window_id, title in windows:
+            if any(word in title.lower() for word in keywords):
+                return window_id, title
+        return None
+
+    def _title_matches_target(self, app_title, window_title):
+        """Check for an exact or partial title match. Only those windows may be trusted by id,
+        a loose keyword match must keep going through the title check."""
+        return bool(window_title) and app_title.lower() in window_title.lower()
+
+    def _activate_window(self, app_title):
+        """Find and activate a window matching the app title. Returns its title, or None if none was activated."""
+        if not app_title:
+            return None
+
+        if WMCTRL_PATH:
+            try:
+                match = self._find_window_wmctrl(app_title)
+                if not match:
+                    return None
+                window_id, title = match
+                subprocess.run([WMCTRL_PATH, "-ia", window_id], check=True, timeout=2)
+                if self._title_matches_target(app_title, title):
+                    self._target_wid = int(window_id, 16)
+                return title
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"wmctrl failed, falling back to pywinctl: {e}")
+
+        window = self._find_existing_window(app_title)
+        if window:
+            try:
+                window.activate()
+                if self._title_matches_target(app_title, window.title):
+                    self._target_wid = window.getHandle()
+                return window.title
+            except Exception as e:
+                print(f"Failed to activate window '{window.title}': {e}")
+        return None
+
+    def _start_application(self, app_argv, app_title, deadline):
+        """Start an application from its argv list or activate an existing instance.
+
+        A newly launched window is waited for until the monotonic deadline.
+        Returns False if the application could not be started.
+        """
+        self._target_wid = None # Found again below once the target window is activated
+        if not app_argv:
             print("No application path provided")
-            return
+            return False
             
         # First, try to find and activate an existing window
-        existing_window = self._find_existing_window(app_title)
-        if existing_window:
-            try:
-                existing_window.activate()
-                print(f"Activated existing window: {existing_window.title}")
-                return
-            except Exception as e:
-                print(f"Failed to activate existing window: {e}")
-                # Continue to launch new instance if activation fails
+        activated_title = self._activate_window(app_title)
+        if activated_title:
+            print(f"Activated existing window: {activated_title}")
+            return True
 
         # No existing window found or activation failed, launch new instance
         try:
-            cmd_parts = app_path.split()
-            
             # Verify the executable exists
-            if not os.path.exists(cmd_parts[0]):
-                print(f"Executable not found: {cmd_parts[0]}")
+            if not os.path.exists(app_argv[0]):
+                print(f"Executable not found: {app_argv[0]}")
                 self.root.after(0, lambda: messagebox.showerror("File Not Found", 
-                    f"The executable was not found:\n{cmd_parts[0]}\n\nPlease check the path in configuration."))
-                return
+                    f"The executable was not found:\n{app_argv[0]}\n\nPlease check the path in configuration."))
+                return False
             
-            process = subprocess.Popen(cmd_parts, env=os.environ)
+            # Run in its own session so terminating it never touches our controlling terminal
+            process = subprocess.Popen(app_argv, close_fds=True, start_new_session=True)
             if "game" in app_title.lower():
+                self._reap_process(self.game_process)
                 self.game_process = process
             else:
+                self._reap_process(self.study_process)
                 self.study_process = process
-            print(f"Started new instance of: {app_path}")
+            print(f"Started new instance of: {app_argv[0]}")
             
-            # Wait a moment and try to find the newly launched window
-            time.sleep(2)
-            new_window = self._find_existing_window(app_title)
-            if new_window:
-                try:
-                    new_window.activate()
-                    print(f"Activated newly launched window: {new_window.title}")
-                except Exception as e:
-                    print(f"Failed to activate newly launched window: {e}")
+            # Activate the newly launched window as soon as it shows up
+            activated_title = self._wait_for_new_window(app_title, deadline)
+            if activated_title:
+                print(f"Activated newly launched window: {activated_title}")
+            return True
             
         except Exception as e:
-            print(f"Error starting application '{app_path}': {e}")
+            print(f"Error starting application '{app_argv[0]}': {e}")
             self.root.after(0, lambda: messagebox.showerror("Execution Error", 
-                f"Failed to start: {app_path}\n\n{str(e)}"))
+                f"Failed to start: {app_argv[0]}\n\n{str(e)}"))
+            return False
+
+    def _wait_for_new_window(self, app_title, deadline):
+        """Wait for a window matching the app title to appear and activate it. Returns its title or None."""
+        while not self.stop_monitoring.is_set():
+            activated_title = self._activate_window(app_title)
+            if activated_title:
+                return activated_title
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"Timed out waiting for new window: {app_title}")
+                return None
+            # Woken by window list or focus changes on X11, otherwise polls
+            self._wait_for_focus_change(remaining)
+        return None
+
+    def _reap_process(self, process):
+        """Reap a subprocess that is about to be replaced, if it has already exited."""
+        if process and process.poll() is None:
+            # Still running (e.g. its window was closed but not the app), leave it to the user
+            print(f"Previous instance (pid {process.pid}) is still running")
 
     def _terminate_process(self, process):
-        """Safely terminate a given subprocess."""
+        """Safely terminate a given subprocess and reap it."""
         if not process: return
         try:
             process.terminate()
@@ -336,6 +706,11 @@ class PomodoroApp:
             process.kill()
         except Exception as e:
             print(f"Error terminating process {process.pid}: {e}")
+        finally:
+            try:
+                process.wait(timeout=1) # Reap the child so it doesn't linger as a zombie
+            except subprocess.TimeoutExpired:
+                print(f"Process {process.pid} did not exit after being killed")
         return None
 
     # --- UI & Event Handlers ---
@@ -363,6 +738,7 @@ class PomodoroApp:
         
         if messagebox.askyesno("Confirm Stop", "Are you sure you want to stop the current Moporodo session?"):
             self.stop_monitoring.set()
+            self._wake_monitor()
             self.timer_running = False
             self._stop_all_sounds()
 
@@ -378,6 +754,7 @@ class PomodoroApp:
     def reset_ui(self):
         """Reset the UI to its initial state."""
         self.timer_running = False
+        self.phase_end_time = None
         self.time_remaining = self.durs["game"]
         self.current_phase = "Session Stopped"
         self.update_labels()
@@ -386,19 +763,66 @@ class PomodoroApp:
 
     def update_timer_display(self):
         """Update the timer display in the GUI every second."""
+        # Called directly as well as from after(), so never leave a second tick queued
+        if self._timer_after_id is not None:
+            self.root.after_cancel(self._timer_after_id)
+            self._timer_after_id = None
+
         if self.timer_running and not self.stop_monitoring.is_set():
-            self.update_labels()
-            self.root.after(1000, self.update_timer_display)
+            if self._ui_visible:
+                self.update_labels()
+                self._timer_after_id = self.root.after(self._ms_until_next_tick(), self.update_timer_display)
+            else:
+                # Nobody is looking, skip redraws and check back less often
+                self._timer_after_id = self.root.after(5000, self.update_timer_display)
 
     def update_labels(self):
         """Update the time and phase labels."""
+        if self.phase_end_time is not None:
+            self.time_remaining = max(0, int(self.phase_end_time - time.monotonic()))
         minutes, seconds = divmod(self.time_remaining, 60)
-        self.time_label.config(text=f"{minutes:02d}:{seconds:02d}")
-        self.phase_label.config(text=self.current_phase)
+        if 0 <= minutes < len(_MM):
+            time_text = _MM[minutes] + ":" + _SS[seconds]
+        else:
+            time_text = f"{minutes:02d}:{seconds:02d}" # Phases of two hours or more, or negative durations
+        # Only touch the widgets when the displayed text actually changes
+        if time_text != self._time_var.get():
+            self._time_var.set(time_text)
+        if self.current_phase != self._phase_var.get():
+            self._phase_var.set(self.current_phase)
+
+    def _ms_until_next_tick(self):
+        """Milliseconds until the displayed countdown next changes."""
+        if self.phase_end_time is None:
+            return 1000
+        remaining = self.phase_end_time - time.monotonic()
+        if remaining <= 0:
+            return 1000 # Between phases, wait for the next one to start
+        return int((remaining % 1) * 1000) + 10
+
+    def on_visibility_change(self, event):
+        """Track whether the main window is visible so hidden updates can be skipped."""
+        if event.widget is not self.root:
+            return
+
+        if event.type == tk.EventType.Unmap:
+            visible = False
+        elif event.type == tk.EventType.Map:
+            visible = True
+        else:
+            visible = event.state != "VisibilityFullyObscured"
+
+        was_visible = self._ui_visible
+        self._ui_visible = visible
+        if visible and not was_visible:
+            # Catch up immediately instead of waiting for the slow hidden tick
+            self.update_labels()
+            self.update_timer_display()
 
     def on_closing(self):
         """Handle the window closing event."""
         self.stop_pomodoro_session()
+        self._shutdown_audio()
         # Clean up pygame
         if PYGAME_AVAILABLE:
             pygame.mixer.quit()
@@ -419,6 +843,11 @@ class PomodoroApp:
         if not config.has_section("Durations"):
             config.add_section("Durations")
 
+        self._apply_config(config)
+        return config
+
+    def _apply_config(self, config):
+        """Derive durations, sounds and command lines from a parsed configuration."""
         # Load durations
         self.durs["game"] = config.getint("Durations", "game_min", fallback=25) * 60
         self.durs["short_study"] = config.getint("Durations", "short_study_min", fallback=5) * 60
@@ -428,11 +857,17 @@ class PomodoroApp:
         # Load sound paths
         for i in range(6):
             self.alert_sounds[f"stage_{i}"] = config.get("Sounds", f"stage_{i}", fallback="system_bell")
-            
-        return config
+
+        # Parse the command lines once per load rather than on every phase
+        self._game_argv = split_command(config.get("Settings", "game_path", fallback=""))
+        self._study_argv = split_command(config.get("Settings", "study_app_path", fallback=""))
+
+        # Decode alert sounds up front so playback is just a hand-off of an in-memory buffer.
+        # Stages whose sound fails to load map to None and use the system bell.
+        self._sound_buffers = {stage: self._load_sound(path) for stage, path in self.alert_sounds.items()}
 
     def save_config(self, config_data):
-        """Save configuration to the INI file."""
+        """Save configuration to the INI file. Returns False if it could not be written."""
         config = configparser.ConfigParser()
         config.add_section("Settings")
         config.add_section("Sounds")
@@ -445,13 +880,49 @@ class PomodoroApp:
         for key, value in config_data["durations"].items():
             config.set("Durations", key, value)
 
-        with open(self.CONFIG_FILE, "w") as configfile:
-            config.write(configfile)
-        
+        try:
+            self._write_config(config)
+        except OSError as e:
+            print(f"Error writing configuration to '{self.CONFIG_FILE}': {e}")
+            messagebox.showerror("Save Failed", f"Could not write {self.CONFIG_FILE}:\n\n{str(e)}")
+            return False
+
         # Clear the sound cache when config is saved
         self.loaded_sounds.clear()
-        self.load_config() # Reload config immediately
+        # Apply the new settings from memory instead of re-reading the file we just wrote
+        self.config = config
+        self._apply_config(config)
         self.update_labels() # Update timer display with new default
+        return True
+
+    def _write_config(self, config):
+        """Write a configuration to the INI file, skipping the write if nothing changed."""
+        buffer = io.StringIO()
+        config.write(buffer)
+        contents = buffer.getvalue()
+
+        try:
+            with open(self.CONFIG_FILE, "r") as configfile:
+                if configfile.read() == contents:
+                    return # Nothing changed, skip the write
+        except FileNotFoundError:
+            pass
+
+        # Write to a temporary file, flush it to disk and swap it in,
+        # so neither a crash nor a power loss leaves a truncated config
+        temp_file = self.CONFIG_FILE + ".tmp"
+        try:
+            with open(temp_file, "w") as configfile:
+                configfile.write(contents)
+                configfile.flush()
+                os.fsync(configfile.fileno())
+            os.replace(temp_file, self.CONFIG_FILE)
+        except OSError:
+            try:
+                os.unlink(temp_file) # Don't leave a partial temp file behind (e.g. disk full)
+            except OSError:
+                pass
+            raise
 
     # --- GUI Setup ---
 
@@ -461,6 +932,8 @@ class PomodoroApp:
         self.root.geometry("960x540")
         self.root.minsize(500, 400)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        for sequence in ("<Map>", "<Unmap>", "<Visibility>"):
+            self.root.bind(sequence, self.on_visibility_change, add="+")
         
         style = ttk.Style()
         style.theme_use('clam')
@@ -470,10 +943,12 @@ class PomodoroApp:
 
         ttk.Label(main_frame, text="Moporodo Timer", font=("Arial", 20, "bold")).pack(pady=(0, 20))
         
-        self.time_label = ttk.Label(main_frame, font=("Arial", 60, "bold"), foreground="darkgreen")
+        self._time_var = tk.StringVar()
+        self.time_label = ttk.Label(main_frame, textvariable=self._time_var, font=("Arial", 60, "bold"), foreground="darkgreen")
         self.time_label.pack(pady=10)
         
-        self.phase_label = ttk.Label(main_frame, text="Ready to Start", font=("Arial", 16))
+        self._phase_var = tk.StringVar(value="Ready to Start")
+        self.phase_label = ttk.Label(main_frame, textvariable=self._phase_var, font=("Arial", 16))
         self.phase_label.pack(pady=5)
         
         self.update_labels() # Initial call to set labels
@@ -591,29 +1066,61 @@ class ConfigWindow(tk.Toplevel):
             "sounds": {k: v.get().strip() for k, v in self.vars["sounds"].items()},
             "durations": {k: v.get().strip() for k, v in self.vars["durations"].items()}
         }
-        self.save_callback(config_data)
+        if not self.save_callback(config_data):
+            return # Keep the dialog open so the settings aren't lost
         messagebox.showinfo("Success", "Configuration saved!", parent=self)
         self.destroy()
 
     def test_paths(self):
         """Test if the configured executable paths are valid."""
-        results = []
+        checks = []
         game_path = self.vars["settings"]["game_path"].get().strip()
         study_path = self.vars["settings"]["study_app_path"].get().strip()
 
         if game_path:
-            if os.path.exists(game_path.split()[0]):
-                results.append("✅ Game executable found.")
-            else:
-                results.append(f"❌ Game executable NOT found at: {game_path}")
-        
+            checks.append(("Game executable", game_path))
         if study_path:
-            if os.path.exists(study_path.split()[0]):
-                results.append("✅ Study app executable found.")
+            checks.append(("Study app executable", study_path))
+
+        if not checks:
+            messagebox.showinfo("Path Test Results", "No paths were entered to test.", parent=self)
+            return
+
+        # Executables on network mounts can be slow to stat, so keep this off the UI thread
+        threading.Thread(target=self._run_path_checks, args=(checks,), daemon=True).start()
+
+    def _check_executable(self, executable):
+        """Check that an executable exists as a regular file."""
+        try:
+            return stat.S_ISREG(os.stat(executable).st_mode)
+        except OSError:
+            return False
+
+    def _run_path_checks(self, checks):
+        """Check all paths in parallel and report the results on the UI thread."""
+        found = [False] * len(checks)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = {executor.submit(self._check_executable, split_command(path)[0]): i
+                       for i, (_, path) in enumerate(checks)}
+            for future in as_completed(futures):
+                found[futures[future]] = future.result()
+
+        results = []
+        for (label, path), ok in zip(checks, found):
+            if ok:
+                results.append(f"✅ {label} found.")
             else:
-                results.append(f"❌ Study app executable NOT found at: {study_path}")
+                results.append(f"❌ {label} NOT found at: {path}")
+
+        def show_results():
+            if self.winfo_exists(): # The dialog may have been closed while checking
+                messagebox.showinfo("Path Test Results", "\n".join(results), parent=self)
 
-        messagebox.showinfo("Path Test Results", "\n".join(results) if results else "No paths were entered to test.", parent=self)
+        try:
+            # Schedule through the main window, which outlives this dialog
+            self.master.after(0, show_results)
+        except tk.TclError:
+            pass # Application is shutting down
 
 
 if __name__ == "__main__":